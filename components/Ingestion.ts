@@ -8,6 +8,8 @@ export interface IngestionArgs {
     vectorStoreConfig: VectorStoreConfig;
     lambdaCodePath?: string;
     timeout?: number;
+    embeddingModelId?: string;
+    embeddingCache?: boolean;
 }
 
 export class Ingestion extends pulumi.ComponentResource {
@@ -17,6 +19,7 @@ export class Ingestion extends pulumi.ComponentResource {
     public readonly lambda: aws.lambda.Function;
     public readonly invokePermission: aws.lambda.Permission;
     public readonly bucketNotification: aws.s3.BucketNotification;
+    public readonly embeddingCacheTable?: aws.dynamodb.Table;
     
     // component synthetic outputs
     public readonly lambdaArn: pulumi.Output<string>;
@@ -75,6 +78,24 @@ export class Ingestion extends pulumi.ComponentResource {
             });
         }
 
+        // Content-hash keyed embedding cache, so re-uploaded chunks skip Bedrock
+        if ( args.embeddingCache ) {
+            this.embeddingCacheTable = new aws.dynamodb.Table(`ingestion-embedding-cache`, {
+                attributes: [{ name: "hash", type: "S" }],
+                hashKey: "hash",
+                billingMode: "PAY_PER_REQUEST",
+            }, { parent: this });
+
+            policyDoc.Statement.push({
+                Effect: "Allow",
+                Action: [
+                    "dynamodb:BatchGetItem",
+                    "dynamodb:BatchWriteItem"
+                ],
+                Resource: this.embeddingCacheTable.arn
+            });
+        }
+
         // Create IAM role with combined policies
         this.role = new aws.iam.Role(`ingestion-lambda-role`, {
             assumeRolePolicy: aws.iam.assumeRolePolicyForPrincipal({ Service: "lambda.amazonaws.com" }),
@@ -106,6 +127,9 @@ export class Ingestion extends pulumi.ComponentResource {
                     INDEX_NAME: args.vectorStoreConfig.indexName,
                     PINECONE_API_KEY: pineconeApiKey,
                     PINECONE_ENVIRONMENT: pineconeEnvironment,
+                    VECTOR_DATA_TYPE: args.vectorStoreConfig.dataType || "float",
+                    EMBEDDING_MODEL_ID: args.embeddingModelId || "amazon.titan-embed-text-v2:0",
+                    EMBEDDING_CACHE_TABLE: this.embeddingCacheTable ? this.embeddingCacheTable.name : "",
                 },
             },
             timeout: args.timeout || 900,
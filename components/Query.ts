@@ -13,6 +13,7 @@ export interface QueryArgs {
   lambdaCodePath?: string;
   timeout?: number;
   pineconeConfig?: PineconeConfig;
+  embeddingModelId?: string;
 }
 
 export class Query extends pulumi.ComponentResource {
@@ -116,6 +117,8 @@ export class Query extends pulumi.ComponentResource {
             INDEX_NAME: args.vectorStoreConfig.indexName,
             PINECONE_API_KEY: args.pineconeConfig?.APIKey || "",
             PINECONE_ENVIRONMENT: args.pineconeConfig?.Environment || "",
+            VECTOR_DATA_TYPE: args.vectorStoreConfig.dataType || "float",
+            EMBEDDING_MODEL_ID: args.embeddingModelId || "amazon.titan-embed-text-v2:0",
           },
         },
         timeout: args.timeout || 180,
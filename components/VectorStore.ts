@@ -9,6 +9,7 @@ export interface VectorStoreArgs {
     dimension?: number;
     metric?: string;
     environment?: string;
+    dataType?: "float" | "byte";
 }
 
 export interface VectorStoreConfig {
@@ -16,6 +17,7 @@ export interface VectorStoreConfig {
     type: string;
     indexName: pulumi.Output<string>;
     collectionName?: string;
+    dataType?: string;
 }
 
 export class VectorStore extends pulumi.ComponentResource {
@@ -112,6 +114,7 @@ export class VectorStore extends pulumi.ComponentResource {
             type: vectorStoreType,
             indexName: this.indexName || pulumi.output("rag-documents-v2"),
             collectionName: vectorStoreType === "opensearch" ? args.collectionName : undefined,
+            dataType: args.dataType || "float",
         };
 
         this.registerOutputs({
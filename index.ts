@@ -4,6 +4,7 @@ import { SecureBucket, VectorStore, Ingestion, Query, ServerlessAccessPolicy } f
 // Read configuration
 const config = new pulumi.Config();
 const vectorStoreType = config.get("vectorStore") || "opensearch";
+const embeddingModelId = config.get("embeddingModelId") || "amazon.titan-embed-text-v2:0";
 const pineconeConfig = vectorStoreType === "pinecone" ? new pulumi.Config("pinecone") : undefined;
 const stackName = pulumi.getStack();
 
@@ -14,17 +15,21 @@ const inputBucket = new SecureBucket("input", { name: `rag-input-${stackName}` }
 const vectorStore = new VectorStore("vector-store", {
     type: vectorStoreType as "opensearch" | "pinecone",
     collectionName: config.require("collectionName"),
+    dataType: (config.get("vectorDataType") || "float") as "float" | "byte",
 });
 
 // Create ingestion pipeline
 const ingestion = new Ingestion("ingestion", {
     inputBucket: inputBucket.bucket,
     vectorStoreConfig: vectorStore.config,
+    embeddingModelId,
+    embeddingCache: config.getBoolean("embeddingCache") || false,
 }, { dependsOn: [inputBucket, vectorStore] });
 
 // Create query service
 const query = new Query("query", {
     vectorStoreConfig: vectorStore.config,
+    embeddingModelId,
     pineconeConfig: vectorStoreType === "pinecone" && pineconeConfig ? {
         APIKey: pineconeConfig.get("APIKey") || "",
         Environment: pineconeConfig.get("Environment") || "us-east-1-aws",
@@ -1,20 +1,35 @@
-import json
+import asyncio
+import gzip
+import hashlib
+import io
 import logging
 import os
+import random
+import re
+import tempfile
+import time
+import uuid
 import boto3
-from typing import List, Dict, Any
+import numpy as np
+import orjson
+from bisect import bisect_left, bisect_right
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import List, Dict, Any, BinaryIO, Iterable, Iterator, Optional
 from urllib.parse import unquote_plus
 
 # LangChain imports
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_aws import BedrockEmbeddings
-from langchain_community.vectorstores import OpenSearchVectorSearch
-from langchain_community.vectorstores import Pinecone as PineconeVectorStore
 from langchain.docstore.document import Document
-import pinecone
+from pinecone import Pinecone, ServerlessSpec
+import tiktoken
+import zstandard
 
 # AWS SDK
 from opensearchpy import OpenSearch, RequestsHttpConnection, AWSV4SignerAuth
+from opensearchpy.exceptions import AuthorizationException
+from opensearchpy.helpers import bulk
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 import boto3
 
 # Configure logging
@@ -28,19 +43,206 @@ AWS_REGION = os.environ.get("AWS_REGION", "us-east-1")
 VECTOR_STORE_TYPE = os.environ.get("VECTOR_STORE_TYPE", "opensearch")
 PINECONE_API_KEY = os.environ.get("PINECONE_API_KEY")
 PINECONE_ENVIRONMENT = os.environ.get("PINECONE_ENVIRONMENT", "us-east-1-aws")
+EMBEDDING_MODEL_ID = os.environ.get("EMBEDDING_MODEL_ID", "amazon.titan-embed-text-v2:0")
+EMBEDDING_PROVIDER = EMBEDDING_MODEL_ID.split(".")[0]
+EMBEDDING_CONCURRENCY = int(os.environ.get("EMBEDDING_CONCURRENCY", "16"))
+BATCH_SIZE = int(os.environ.get("BATCH_SIZE", "96"))
+MAX_RECORD_WORKERS = 8
+BULK_CHUNK_SIZE = 500
+PARALLEL_BULK_THRESHOLD = 5000
+EMBEDDING_CACHE_TABLE = os.environ.get("EMBEDDING_CACHE_TABLE")
+CACHE_BATCH_ATTEMPTS = 5
+VECTOR_DATA_TYPE = os.environ.get("VECTOR_DATA_TYPE", "float")
+CHUNK_SIZE_TOKENS = int(os.environ.get("CHUNK_SIZE_TOKENS", "600"))
+CHUNK_OVERLAP_TOKENS = int(os.environ.get("CHUNK_OVERLAP_TOKENS", "100"))
+TEXT_WINDOW_CHARS = 1024 * 1024
+DOWNLOAD_SPOOL_BYTES = 32 * 1024 * 1024
 
-# Initialize AWS clients
-bedrock_runtime = boto3.client("bedrock-runtime", region_name=AWS_REGION)
-s3_client = boto3.client("s3", region_name=AWS_REGION)
+# Chunks advance by CHUNK_SIZE_TOKENS - CHUNK_OVERLAP_TOKENS tokens, which must be positive
+if not 0 <= CHUNK_OVERLAP_TOKENS < CHUNK_SIZE_TOKENS:
+    raise ValueError(
+        f"CHUNK_OVERLAP_TOKENS ({CHUNK_OVERLAP_TOKENS}) must be at least 0 and less than "
+        f"CHUNK_SIZE_TOKENS ({CHUNK_SIZE_TOKENS})"
+    )
+
+# Markdown-style headings, recorded as the section of the chunks that follow them
+HEADING_PATTERN = re.compile(r"^#{1,6}[ \t]+(.+?)[ \t]*#*[ \t\r]*$", re.MULTILINE)
+HEADING_PREFIX = re.compile(r"#{1,6}(?:[ \t]|$)")
+
+# Parallel byte-range GETs for large objects, through the native CRT transfer
+# client; boto3 rejects any option the CRT client doesn't support
+S3_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=10,
+    preferred_transfer_client="crt"
+)
+
+# Initialize AWS clients (size the connection pool for the container-wide embedding
+# limit plus one hedge per call, and fail slow reads fast so retries kick in;
+# Cohere batches carry up to 96 texts, so they get a longer read budget)
+bedrock_runtime = boto3.client(
+    "bedrock-runtime",
+    region_name=AWS_REGION,
+    config=Config(
+        read_timeout=15 if EMBEDDING_PROVIDER == "cohere" else 2,
+        retries={"max_attempts": 3, "mode": "adaptive"},
+        max_pool_connections=EMBEDDING_CONCURRENCY * 2
+    )
+)
+s3_client = boto3.client(
+    "s3",
+    region_name=AWS_REGION,
+    config=Config(
+        connect_timeout=1,
+        read_timeout=3,
+        retries={"max_attempts": 5, "mode": "adaptive"},
+        max_pool_connections=S3_TRANSFER_CONFIG.max_concurrency * MAX_RECORD_WORKERS
+    )
+)
+dynamodb_client = boto3.client("dynamodb", region_name=AWS_REGION) if EMBEDDING_CACHE_TABLE else None
+
+# Embedding workers shared by every record in the container, so EMBEDDING_CONCURRENCY
+# bounds in-flight Bedrock calls however many documents are processed at once
+_EMBEDDING_EXECUTOR = ThreadPoolExecutor(max_workers=EMBEDDING_CONCURRENCY)
+
+# Runs each embedding call and its hedge, matching the Bedrock connection pool
+_HEDGE_EXECUTOR = ThreadPoolExecutor(max_workers=EMBEDDING_CONCURRENCY * 2)
+
+# Lazily built singletons, reused across warm invocations
+_EMBEDDINGS = None
+_OPENSEARCH_CLIENT = None
+_TOKENIZER = None
+_INDEX_READY = False
+_PC = None
+_PC_INDEX = None
+
+# Resolve the OpenSearch host and SigV4 credentials once per container
+_OS_HOST = OPENSEARCH_ENDPOINT.replace('https://', '').rstrip('/') if OPENSEARCH_ENDPOINT else None
+_CREDS = boto3.Session().get_credentials() if VECTOR_STORE_TYPE == "opensearch" else None
+_AUTH = AWSV4SignerAuth(_CREDS, AWS_REGION, 'aoss') if _CREDS else None
+
+def hedge_call(fn, *args, hedge_delay_ms: int = 500, max_hedges: int = 1, **kwargs):
+    """Call fn, firing a duplicate call each time hedge_delay_ms passes without a
+    result (up to max_hedges), and return whichever call succeeds first"""
+    pending = {_HEDGE_EXECUTOR.submit(fn, *args, **kwargs)}
+    hedges = 0
+    error = None
+    while True:
+        # Only wait out the hedge delay while there are hedges left to fire
+        timeout = hedge_delay_ms / 1000 if hedges < max_hedges else None
+        done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            # Losing calls are left to finish on the shared pool
+            if future.exception() is None:
+                return future.result()
+            error = future.exception()
+        
+        if not done:
+            pending.add(_HEDGE_EXECUTOR.submit(fn, *args, **kwargs))
+            hedges += 1
+        elif not pending:
+            raise error
+
+class BatchedBedrockEmbeddings(BedrockEmbeddings):
+    """Bedrock embeddings that batch texts for models accepting arrays (Cohere)
+    and issue concurrent single-text calls for the rest (Titan)"""
+    
+    batch_size: int = 96
+    dimensions: int = 1024
+    hedge_delay_ms: int = 250
+    batch_hedge_delay_ms: int = 1000
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Compute document embeddings with as few sequential round-trips as possible"""
+        return self.embed_array(texts).tolist()
+    
+    def embed_array(self, texts: List[str]) -> np.ndarray:
+        """Compute document embeddings into a single (N, dimensions) float32 array"""
+        vectors = np.empty((len(texts), self.dimensions), dtype=np.float32)
+        if not texts:
+            return vectors
+        
+        if self._inferred_provider == "cohere":
+            # Cohere accepts up to 96 texts per InvokeModel call
+            def _embed_batch(start: int):
+                batch = texts[start:start + self.batch_size]
+                vectors[start:start + len(batch)] = self._embed_cohere_batch(batch)
+            
+            asyncio.run(self._map_concurrently(_embed_batch, range(0, len(texts), self.batch_size)))
+        else:
+            # Titan only takes a single input per call, so fan the calls out instead
+            def _embed_one(i: int):
+                vectors[i] = self._embed_text(texts[i])
+            
+            asyncio.run(self._map_concurrently(_embed_one, range(len(texts))))
+        
+        if self.normalize:
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors
+    
+    def _embed_text(self, text: str) -> List[float]:
+        """Embed a single text with one InvokeModel call"""
+        body = orjson.dumps({
+            "inputText": text.replace(os.linesep, " "),
+            **(self.model_kwargs or {})
+        })
+        return hedge_call(self._invoke_model, body, "embedding", hedge_delay_ms=self.hedge_delay_ms)
+    
+    def _embed_cohere_batch(self, texts: List[str]) -> List[List[float]]:
+        """Embed a batch of texts with a single Cohere InvokeModel call"""
+        body = orjson.dumps({
+            "texts": [text.replace(os.linesep, " ") for text in texts],
+            "input_type": "search_document",
+            # Cohere rejects inputs over ~512 tokens, which 600-token chunks can exceed
+            "truncate": "END",
+            **(self.model_kwargs or {})
+        })
+        return hedge_call(self._invoke_model, body, "embeddings", hedge_delay_ms=self.batch_hedge_delay_ms)
+    
+    def _invoke_model(self, body: bytes, field: str) -> Any:
+        """Call InvokeModel and return a field of the JSON response"""
+        response = self.client.invoke_model(
+            modelId=self.model_id,
+            body=body,
+            accept="application/json",
+            contentType="application/json"
+        )
+        return orjson.loads(response["body"].read())[field]
+    
+    async def _map_concurrently(self, fn, items: Iterable[Any]) -> List[Any]:
+        """Run fn over items on the shared embedding workers"""
+        loop = asyncio.get_running_loop()
+        return await asyncio.gather(*[loop.run_in_executor(_EMBEDDING_EXECUTOR, fn, item) for item in items])
+
+def get_tokenizer():
+    """Return the shared tiktoken encoding, loading it on first use"""
+    global _TOKENIZER
+    if _TOKENIZER is None:
+        _TOKENIZER = tiktoken.get_encoding("cl100k_base")
+    return _TOKENIZER
+
+def refresh_opensearch_auth():
+    """Re-resolve AWS credentials and drop the client signed with the stale ones"""
+    global _CREDS, _AUTH, _OPENSEARCH_CLIENT
+    _CREDS = boto3.Session().get_credentials()
+    _AUTH = AWSV4SignerAuth(_CREDS, AWS_REGION, 'aoss')
+    _OPENSEARCH_CLIENT = None
+
+def call_with_auth_refresh(fn, *args, **kwargs):
+    """Call fn, refreshing OpenSearch credentials and retrying once if the signature is rejected"""
+    try:
+        return fn(*args, **kwargs)
+    except AuthorizationException:
+        logger.warning("OpenSearch rejected request signature, refreshing credentials")
+        refresh_opensearch_auth()
+        return fn(*args, **kwargs)
 
 def create_opensearch_client():
     """Create OpenSearch client with AWS authentication"""
-    credentials = boto3.Session().get_credentials()
-    auth = AWSV4SignerAuth(credentials, AWS_REGION, 'aoss')
-    
     client = OpenSearch(
-        hosts=[{'host': OPENSEARCH_ENDPOINT.replace('https://', ''), 'port': 443}],
-        http_auth=auth,
+        hosts=[{'host': _OS_HOST, 'port': 443}],
+        http_auth=_AUTH,
         use_ssl=True,
         verify_certs=True,
         connection_class=RequestsHttpConnection,
@@ -48,57 +250,51 @@ def create_opensearch_client():
     )
     return client
 
-def create_vector_store():
-    """Create vector store instance"""
-    # Initialize embeddings
-    embeddings = BedrockEmbeddings(
-        client=bedrock_runtime,
-        model_id="amazon.titan-embed-text-v2:0"
-    )
-    
-    if VECTOR_STORE_TYPE == "opensearch":
-        
-        # Create AWS auth for vector store
-        credentials = boto3.Session().get_credentials()
-        auth = AWSV4SignerAuth(credentials, AWS_REGION, 'aoss')
-        
-        # Create vector store
-        vector_store = OpenSearchVectorSearch(
-            index_name=INDEX_NAME,
-            embedding_function=embeddings,
-            opensearch_url=OPENSEARCH_ENDPOINT,
-            http_auth=auth,
-            use_ssl=True,
-            verify_certs=True,
-            connection_class=RequestsHttpConnection,
-            service='aoss'
-        )
-        return vector_store
-    
-    elif VECTOR_STORE_TYPE == "pinecone":
+def get_opensearch_client():
+    """Return the shared OpenSearch client, creating it on first use"""
+    global _OPENSEARCH_CLIENT
+    if _OPENSEARCH_CLIENT is None:
+        _OPENSEARCH_CLIENT = create_opensearch_client()
+    return _OPENSEARCH_CLIENT
+
+def get_pinecone_client():
+    """Return the shared Pinecone client, creating it on first use"""
+    global _PC
+    if _PC is None:
         if not PINECONE_API_KEY:
             raise ValueError("PINECONE_API_KEY environment variable is required for Pinecone")
-        
-        # Initialize Pinecone
-        pinecone.init(
-            api_key=PINECONE_API_KEY,
-            environment=PINECONE_ENVIRONMENT
-        )
-        
-        # Create vector store
-        vector_store = PineconeVectorStore.from_existing_index(
-            index_name=INDEX_NAME,
-            embedding=embeddings
-        )
-        return vector_store
-    
-    else:
-        raise ValueError(f"Unsupported vector store type: {VECTOR_STORE_TYPE}")
+        _PC = Pinecone(api_key=PINECONE_API_KEY)
+    return _PC
+
+def get_pinecone_index():
+    """Return the shared Pinecone index handle, creating it on first use"""
+    global _PC_INDEX
+    if _PC_INDEX is None:
+        # Passing the host avoids a describe_index lookup to resolve it
+        _PC_INDEX = get_pinecone_client().Index(name=INDEX_NAME, host=OPENSEARCH_ENDPOINT or "")
+    return _PC_INDEX
+
+def create_embeddings():
+    """Create Bedrock embeddings instance"""
+    embeddings = BatchedBedrockEmbeddings(
+        client=bedrock_runtime,
+        model_id=EMBEDDING_MODEL_ID,
+        batch_size=min(BATCH_SIZE, 96),
+        normalize=True
+    )
+    return embeddings
+
+def get_embeddings():
+    """Return the shared embeddings instance, creating it on first use"""
+    global _EMBEDDINGS
+    if _EMBEDDINGS is None:
+        _EMBEDDINGS = create_embeddings()
+    return _EMBEDDINGS
 
 def create_index_if_not_exists():
     """Create index with proper mappings if it doesn't exist"""
     if VECTOR_STORE_TYPE == "opensearch":
-        client = create_opensearch_client()
+        client = get_opensearch_client()
         
         try:
             # Check if index exists
@@ -106,6 +302,28 @@ def create_index_if_not_exists():
                 logger.info(f"Creating OpenSearch index: {INDEX_NAME}")
                 vector_field = "vector_field"
                 dim = 1024  # Dimension for Titan embeddings
+                if VECTOR_DATA_TYPE == "byte":
+                    # int8 vectors cut index size and kNN memory traffic ~4x
+                    vector_mapping = {
+                        "type": "knn_vector",
+                        "dimension": dim,
+                        "data_type": "byte",
+                        "method": {
+                            "name": "hnsw",
+                            "space_type": "cosinesimil",
+                            "engine": "lucene"
+                        }
+                    }
+                else:
+                    vector_mapping = {
+                        "type": "knn_vector",
+                        "dimension": dim,
+                        "method": {
+                            "name": "hnsw",
+                            "space_type": "cosinesimil",
+                            "engine": "nmslib"
+                        }
+                    }
                 index_body = {
                     "settings": {
                         "index": {
@@ -115,15 +333,7 @@ def create_index_if_not_exists():
                     },
                     "mappings": {
                         "properties": {
-                            vector_field: {
-                                "type": "knn_vector",
-                                "dimension": dim,
-                                "method": {
-                                    "name": "hnsw",
-                                    "space_type": "cosinesimil",
-                                    "engine": "nmslib"
-                                }
-                            },
+                            vector_field: vector_mapping,
                             "text": {"type": "text"},
                             "metadata": {
                                 "properties": {
@@ -147,25 +357,21 @@ def create_index_if_not_exists():
                 raise
     
     elif VECTOR_STORE_TYPE == "pinecone":
-        if not PINECONE_API_KEY:
-            raise ValueError("PINECONE_API_KEY environment variable is required for Pinecone")
-        
-        # Initialize Pinecone
-        pinecone.init(
-            api_key=PINECONE_API_KEY,
-            environment=PINECONE_ENVIRONMENT
-        )
+        client = get_pinecone_client()
         
         try:
             # Check if index exists
-            if INDEX_NAME not in pinecone.list_indexes():
+            if INDEX_NAME not in client.list_indexes().names():
                 logger.info(f"Creating Pinecone index: {INDEX_NAME}")
                 
                 # Create index with 1024 dimensions for Titan embeddings
-                pinecone.create_index(
+                # Legacy environments are "<region>-<cloud>", e.g. us-east-1-aws
+                region, _, cloud = PINECONE_ENVIRONMENT.rpartition("-")
+                client.create_index(
                     name=INDEX_NAME,
                     dimension=1024,
-                    metric="cosine"
+                    metric="cosine",
+                    spec=ServerlessSpec(cloud=cloud, region=region)
                 )
                 logger.info(f"Pinecone index {INDEX_NAME} created successfully")
             else:
@@ -176,106 +382,333 @@ def create_index_if_not_exists():
             if "already exists" not in str(e).lower():
                 raise
 
-def load_document_from_s3(bucket: str, key: str) -> List[Document]:
-    """Load document from S3 using LangChain"""
+def open_decoded_body(body: BinaryIO, content_encoding: Optional[str]) -> BinaryIO:
+    """Wrap an object body in a streaming decompressor matching its Content-Encoding"""
+    encoding = (content_encoding or "").lower()
+    if encoding == "gzip":
+        return gzip.GzipFile(fileobj=body)
+    if encoding == "zstd":
+        return zstandard.ZstdDecompressor().stream_reader(body)
+    return body
+
+def load_document_from_s3(bucket: str, key: str) -> Iterator[Document]:
+    """Stream a document from S3 as consecutive text windows"""
     try:
-        # Get object from S3
-        response = s3_client.get_object(Bucket=bucket, Key=key)
-        content = response['Body'].read().decode('utf-8')
-        
-        # Create LangChain document
-        document = Document(
-            page_content=content,
-            metadata={
-                "source": f"s3://{bucket}/{key}",
-                "bucket": bucket,
-                "key": key,
-                "content_type": response.get('ContentType', 'text/plain')
-            }
-        )
+        # Get object metadata, then download the body with concurrent ranged GETs
+        response = s3_client.head_object(Bucket=bucket, Key=key)
+        metadata = {
+            "source": f"s3://{bucket}/{key}",
+            "bucket": bucket,
+            "key": key,
+            "content_type": response.get('ContentType', 'text/plain')
+        }
         
-        return [document]
+        # Small objects stay in memory, large ones spill to /tmp instead of being held as bytes and str
+        with tempfile.SpooledTemporaryFile(max_size=DOWNLOAD_SPOOL_BYTES) as buffer:
+            s3_client.download_fileobj(bucket, key, buffer, Config=S3_TRANSFER_CONFIG)
+            buffer.seek(0)
+            
+            # Decompress gzip/zstd uploads and decode text incrementally
+            reader = io.TextIOWrapper(
+                open_decoded_body(buffer, response.get('ContentEncoding')),
+                encoding='utf-8',
+                errors='replace'
+            )
+            while window := reader.read(TEXT_WINDOW_CHARS):
+                yield Document(page_content=window, metadata=metadata)
         
     except Exception as e:
         logger.error(f"Error loading document from S3: {str(e)}")
         raise
 
-def chunk_documents(documents: List[Document]) -> List[Document]:
-    """Split documents into chunks using LangChain text splitter"""
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=100,
-        length_function=len,
-        separators=["\n\n", "\n", " ", ""]
-    )
+def chunk_documents(windows: Iterable[Document]) -> List[Document]:
+    """Split a document, streamed as consecutive text windows, into overlapping token chunks"""
+    encoding = get_tokenizer()
+    stride = CHUNK_SIZE_TOKENS - CHUNK_OVERLAP_TOKENS
+    chunks = []
+    window_count = 0
+    pending = ""
+    pending_start = 0
     
-    chunks = text_splitter.split_documents(documents)
+    # Headings are scanned line by line in document coordinates, independently of
+    # the token carry-over, holding back the last line until it is complete. Lines
+    # longer than about a chunk's worth of characters are body text, never headings,
+    # so a long line starting with "#" can't hold back the whole document
+    heading_starts = []
+    heading_names = []
+    heading_max_chars = max(CHUNK_SIZE_TOKENS * 4, 256)
+    partial_line = ""
+    partial_line_start = 0
+    skip_line = False
     
-    # Add chunk metadata
-    for i, chunk in enumerate(chunks):
-        chunk.metadata.update({
-            "chunk_id": i,
-            "chunk_size": len(chunk.page_content)
-        })
+    windows = iter(windows)
+    window = next(windows, None)
+    while window is not None:
+        next_window = next(windows, None)
+        window_count += 1
+        
+        lines = partial_line + window.page_content
+        scan_start = 0
+        if skip_line:
+            # Resume scanning after the end of the body line dropped in an earlier window
+            newline = lines.find("\n")
+            scan_start = newline + 1 if newline >= 0 else len(lines)
+            skip_line = newline < 0
+        complete_end = max(lines.rfind("\n") + 1, scan_start) if next_window is not None else len(lines)
+        for match in HEADING_PATTERN.finditer(lines, scan_start, complete_end):
+            line_end = lines.find("\n", match.start(), complete_end)
+            if (line_end if line_end >= 0 else complete_end) - match.start() <= heading_max_chars:
+                heading_starts.append(partial_line_start + match.start())
+                heading_names.append(match.group(1))
+        partial_line = lines[complete_end:]
+        partial_line_start += complete_end
+        if partial_line and (len(partial_line) > heading_max_chars or not HEADING_PREFIX.match(partial_line)):
+            partial_line_start += len(partial_line)
+            partial_line = ""
+            skip_line = True
+        
+        # Tokenize the carried-over tail plus this window once; the character offset
+        # of every token lets chunks be sliced straight out of the text
+        tokens = encoding.encode(pending + window.page_content, disallowed_special=())
+        text, offsets = encoding.decode_with_offsets(tokens)
+        
+        if next_window is not None:
+            # Only emit chunks that end inside this window; the rest carries over.
+            # A cut-off line that may still be a heading also holds back chunks starting in it
+            stop = len(tokens) - CHUNK_SIZE_TOKENS
+            if partial_line:
+                stop = min(stop, bisect_left(offsets, partial_line_start - pending_start))
+            starts = range(0, max(stop, 0), stride)
+        elif tokens:
+            starts = range(0, max(len(tokens) - CHUNK_OVERLAP_TOKENS, 1), stride)
+        else:
+            starts = range(0)
+        
+        for start in starts:
+            end = start + CHUNK_SIZE_TOKENS
+            char_start = offsets[start]
+            char_end = offsets[end] if end < len(tokens) else len(text)
+            
+            # Chunk metadata is built in one pass with the chunk itself, sized from the offsets
+            metadata = {
+                **window.metadata,
+                "chunk_id": len(chunks),
+                "chunk_size": char_end - char_start
+            }
+            heading_index = bisect_right(heading_starts, pending_start + char_start) - 1
+            if heading_index >= 0:
+                metadata["section"] = heading_names[heading_index]
+            
+            chunks.append(Document(page_content=text[char_start:char_end], metadata=metadata))
+        
+        # Carry the text from the first unemitted chunk into the next window
+        carry_start = len(starts) * stride
+        carry_char = offsets[carry_start] if carry_start < len(tokens) else len(text)
+        pending = text[carry_char:]
+        pending_start += carry_char
+        window = next_window
     
-    logger.info(f"Created {len(chunks)} chunks from {len(documents)} documents")
+    logger.info(f"Created {len(chunks)} chunks from {window_count} text windows")
     return chunks
 
+def embedding_cache_key(text: str) -> str:
+    """Hash normalized chunk text so near-duplicate chunks share a cache entry"""
+    normalized = " ".join(text.lower().split())
+    return hashlib.sha256(f"{EMBEDDING_MODEL_ID}:{normalized}".encode("utf-8")).hexdigest()
+
+def send_cache_batch(call, request: Dict[str, Any], unprocessed_field: str) -> Iterator[Dict[str, Any]]:
+    """Send a DynamoDB batch request, resending unprocessed items with exponential backoff"""
+    for attempt in range(CACHE_BATCH_ATTEMPTS):
+        if attempt:
+            # Full jitter, doubling from 50 ms up to a 1 s cap
+            time.sleep(random.uniform(0, min(1.0, 0.05 * 2 ** attempt)))
+        response = call(RequestItems=request)
+        yield response
+        request = response.get(unprocessed_field)
+        if not request:
+            return
+    
+    # The cache is best effort, leftover reads become misses and leftover writes are skipped
+    logger.warning(f"Embedding cache left items unprocessed after {CACHE_BATCH_ATTEMPTS} attempts")
+
+def get_cached_embeddings(keys: List[str]) -> Dict[str, np.ndarray]:
+    """Fetch cached embeddings from DynamoDB, keyed by content hash"""
+    cached = {}
+    for start in range(0, len(keys), 100):
+        request = {EMBEDDING_CACHE_TABLE: {"Keys": [{"hash": {"S": key}} for key in keys[start:start + 100]]}}
+        for response in send_cache_batch(dynamodb_client.batch_get_item, request, "UnprocessedKeys"):
+            for item in response["Responses"].get(EMBEDDING_CACHE_TABLE, []):
+                cached[item["hash"]["S"]] = np.frombuffer(item["vector"]["B"], dtype=np.float32)
+    return cached
+
+def put_cached_embeddings(vectors: Dict[str, np.ndarray]):
+    """Write embeddings to DynamoDB as packed float32 binaries"""
+    items = [
+        {"PutRequest": {"Item": {"hash": {"S": key}, "vector": {"B": vector.tobytes()}}}}
+        for key, vector in vectors.items()
+    ]
+    for start in range(0, len(items), 25):
+        request = {EMBEDDING_CACHE_TABLE: items[start:start + 25]}
+        for _ in send_cache_batch(dynamodb_client.batch_write_item, request, "UnprocessedItems"):
+            pass
+
+def embed_with_cache(embeddings: BatchedBedrockEmbeddings, texts: List[str]) -> np.ndarray:
+    """Embed texts, only calling Bedrock for chunks missing from the embedding cache"""
+    if not EMBEDDING_CACHE_TABLE or not texts:
+        return embeddings.embed_array(texts)
+    
+    keys = [embedding_cache_key(text) for text in texts]
+    try:
+        cached = get_cached_embeddings(list(dict.fromkeys(keys)))
+    except Exception as e:
+        logger.warning(f"Error reading embedding cache: {str(e)}")
+        cached = {}
+    
+    # Embed each distinct cache miss once
+    misses = {}
+    for key, text in zip(keys, texts):
+        if key not in cached and key not in misses:
+            misses[key] = text
+    
+    if misses:
+        vectors = dict(zip(misses.keys(), embeddings.embed_array(list(misses.values()))))
+        try:
+            put_cached_embeddings(vectors)
+        except Exception as e:
+            logger.warning(f"Error writing embedding cache: {str(e)}")
+        cached.update(vectors)
+    
+    logger.info(f"Embedding cache served {len(texts) - len(misses)} of {len(texts)} chunks")
+    return np.stack([cached[key] for key in keys])
+
+def quantize_embeddings(vectors: np.ndarray) -> np.ndarray:
+    """Quantize embeddings to int8 for OpenSearch byte vectors, scaling each so its largest component maps to ±127 (cosine similarity is scale invariant)"""
+    arr = np.asarray(vectors, dtype=np.float32)
+    arr = arr * (127 / np.abs(arr).max(axis=-1, keepdims=True))
+    return np.clip(np.round(arr), -128, 127).astype(np.int8)
+
+def send_bulk_batches(batches: List[List[Dict[str, Any]]], workers: int) -> List[List[Dict[str, Any]]]:
+    """Send each batch as one bulk request and return the batches rejected for their signature"""
+    client = get_opensearch_client()
+    rejected = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(bulk, client, batch, chunk_size=len(batch), request_timeout=60) for batch in batches]
+        for batch, future in zip(batches, futures):
+            try:
+                future.result()
+            except AuthorizationException:
+                rejected.append(batch)
+    return rejected
+
+def bulk_index_opensearch_embeddings(texts: List[str], vectors: List[List[float]], metadatas: List[Dict[str, Any]]):
+    """Index precomputed embeddings with the OpenSearch bulk API"""
+    # Same document shape LangChain's OpenSearchVectorSearch reads back at query time
+    actions = [
+        {"_index": INDEX_NAME, "_source": {"text": text, "vector_field": vector, "metadata": metadata}}
+        for text, vector, metadata in zip(texts, vectors, metadatas)
+    ]
+    batches = [actions[start:start + BULK_CHUNK_SIZE] for start in range(0, len(actions), BULK_CHUNK_SIZE)]
+    
+    # Large documents send several bulk requests at once
+    workers = 4 if len(actions) > PARALLEL_BULK_THRESHOLD else 1
+    
+    # Documents get server-assigned IDs, so only resend the batches OpenSearch
+    # rejected; batches that were already indexed would otherwise be duplicated
+    rejected = send_bulk_batches(batches, workers)
+    if rejected:
+        logger.warning("OpenSearch rejected request signature, refreshing credentials")
+        refresh_opensearch_auth()
+        rejected = send_bulk_batches(rejected, workers)
+        if rejected:
+            raise RuntimeError(f"OpenSearch rejected {len(rejected)} bulk requests after refreshing credentials")
+
+def upsert_pinecone_embeddings(texts: List[str], vectors: List[List[float]], metadatas: List[Dict[str, Any]], batch_size: int = 100):
+    """Upsert precomputed embeddings into the Pinecone index"""
+    index = get_pinecone_index()
+    
+    # Store the chunk text under the same key LangChain reads back at query time
+    records = [
+        (str(uuid.uuid4()), vector, {**metadata, "text": text})
+        for text, vector, metadata in zip(texts, vectors, metadatas)
+    ]
+    for start in range(0, len(records), batch_size):
+        index.upsert(vectors=records[start:start + batch_size])
+
 def store_chunks_in_vector_store(chunks: List[Document]):
     """Store document chunks in vector store with embeddings"""
-    vector_store = create_vector_store()
-    
     # Extract texts and metadata
     texts = [chunk.page_content for chunk in chunks]
     metadatas = [chunk.metadata for chunk in chunks]
     
-    # Add to vector store (embeddings are generated automatically)
-    vector_store.add_texts(texts=texts, metadatas=metadatas)
+    # Generate embeddings once, batched or concurrent depending on the model,
+    # skipping chunks already in the embedding cache
+    vectors = embed_with_cache(get_embeddings(), texts)
+    
+    # Write precomputed embeddings directly so the vector store doesn't re-embed,
+    # converting to Python lists only at the serialization boundary
+    if VECTOR_STORE_TYPE == "opensearch":
+        if VECTOR_DATA_TYPE == "byte":
+            vectors = quantize_embeddings(vectors)
+        bulk_index_opensearch_embeddings(texts, vectors.tolist(), metadatas)
+    elif VECTOR_STORE_TYPE == "pinecone":
+        upsert_pinecone_embeddings(texts, vectors.tolist(), metadatas)
+    else:
+        raise ValueError(f"Unsupported vector store type: {VECTOR_STORE_TYPE}")
     
     logger.info(f"Successfully stored {len(chunks)} chunks with embeddings in {VECTOR_STORE_TYPE} vector store")
 
+def process_record(record: Dict[str, Any]):
+    """Load, chunk and store the document referenced by an S3 event record"""
+    # Extract S3 information
+    bucket = record['s3']['bucket']['name']
+    key = unquote_plus(record['s3']['object']['key'])
+    
+    logger.info(f"Processing document: s3://{bucket}/{key}")
+    
+    # Stream document from S3 and chunk it window by window
+    chunks = chunk_documents(load_document_from_s3(bucket, key))
+    
+    # Store in vector store
+    store_chunks_in_vector_store(chunks)
+    
+    logger.info(f"Successfully processed document: {key}")
+
 def lambda_handler(event, context):
     """Main Lambda handler for document ingestion"""
-    logger.info(f"Received event: {json.dumps(event)}")
+    global _INDEX_READY
+    # Serializing the whole event is only worth it when debugging
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Received event: {orjson.dumps(event).decode()}")
     
     try:
-        # Create index if it doesn't exist
-        create_index_if_not_exists()
+        # Create index if it doesn't exist (checked once per container)
+        if not _INDEX_READY:
+            call_with_auth_refresh(create_index_if_not_exists)
+            _INDEX_READY = True
         
-        # Process S3 events
-        for record in event.get('Records', []):
-            if record.get('eventSource') == 'aws:s3':
-                # Extract S3 information
-                bucket = record['s3']['bucket']['name']
-                key = unquote_plus(record['s3']['object']['key'])
-                
-                logger.info(f"Processing document: s3://{bucket}/{key}")
-                
-                # Load document from S3
-                documents = load_document_from_s3(bucket, key)
-                
-                # Chunk documents
-                chunks = chunk_documents(documents)
-                
-                # Store in vector store
-                store_chunks_in_vector_store(chunks)
-                
-                logger.info(f"Successfully processed document: {key}")
+        # Warm the shared embeddings before fanning out across threads
+        get_embeddings()
+        
+        # Process S3 events concurrently
+        records = [record for record in event.get('Records', []) if record.get('eventSource') == 'aws:s3']
+        if records:
+            with ThreadPoolExecutor(max_workers=min(len(records), MAX_RECORD_WORKERS)) as executor:
+                list(executor.map(process_record, records))
         
         return {
             'statusCode': 200,
-            'body': json.dumps({
+            'body': orjson.dumps({
                 'message': 'Documents processed successfully',
                 'processed_records': len(event.get('Records', []))
-            })
+            }).decode()
         }
         
     except Exception as e:
         logger.error(f"Error processing documents: {str(e)}")
         return {
             'statusCode': 500,
-            'body': json.dumps({
+            'body': orjson.dumps({
                 'error': str(e),
                 'message': 'Failed to process documents'
-            })
+            }).decode()
         }
\ No newline at end of file
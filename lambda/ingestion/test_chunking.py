@@ -0,0 +1,113 @@
+import random
+
+import pytest
+import tiktoken
+from langchain.docstore.document import Document
+
+import main
+
+METADATA = {"source": "s3://bucket/doc.md", "bucket": "bucket", "key": "doc.md", "content_type": "text/markdown"}
+
+@pytest.fixture(autouse=True)
+def byte_tokenizer(monkeypatch):
+    """Use a merge-free byte vocabulary so token boundaries don't depend on where text is cut"""
+    encoding = tiktoken.Encoding(
+        name="bytes",
+        pat_str=r"\S+|\s+",
+        mergeable_ranks={bytes([i]): i for i in range(256)},
+        special_tokens={}
+    )
+    monkeypatch.setattr(main, "_TOKENIZER", encoding)
+    monkeypatch.setattr(main, "CHUNK_SIZE_TOKENS", 40)
+    monkeypatch.setattr(main, "CHUNK_OVERLAP_TOKENS", 10)
+
+def make_text(rng: random.Random) -> str:
+    """Build markdown-ish text with headings, mid-line hashes and blank lines"""
+    words = ["alpha", "beta", "gamma", "issue #12", "a ## b", "delta", "epsilon"]
+    lines = []
+    for _ in range(rng.randint(0, 60)):
+        if rng.random() < 0.15:
+            lines.append(f"{'#' * rng.randint(1, 3)} Heading {rng.randint(0, 99)}")
+        else:
+            lines.append(" ".join(rng.choice(words) for _ in range(rng.randint(0, 12))))
+    return "\n".join(lines)
+
+def split_windows(text: str, rng: random.Random):
+    """Cut text into windows at random positions"""
+    cuts = sorted(rng.sample(range(1, len(text)), min(rng.randint(0, 8), max(len(text) - 1, 0))))
+    bounds = [0, *cuts, len(text)]
+    return [Document(page_content=text[start:end], metadata=METADATA) for start, end in zip(bounds, bounds[1:])]
+
+def as_tuples(chunks):
+    return [(chunk.page_content, chunk.metadata) for chunk in chunks]
+
+def test_windowed_chunks_match_single_window():
+    rng = random.Random(0)
+    for _ in range(300):
+        text = make_text(rng)
+        expected = main.chunk_documents([Document(page_content=text, metadata=METADATA)])
+        assert as_tuples(main.chunk_documents(split_windows(text, rng))) == as_tuples(expected)
+
+def test_chunks_overlap_and_cover_text():
+    text = "".join(chr(ord("a") + i % 26) for i in range(200))
+    chunks = main.chunk_documents([Document(page_content=text[:70], metadata=METADATA), Document(page_content=text[70:], metadata=METADATA)])
+
+    assert [chunk.page_content for chunk in chunks] == [text[start:start + 40] for start in range(0, 190, 30)]
+    assert [chunk.metadata["chunk_id"] for chunk in chunks] == list(range(len(chunks)))
+    assert all(chunk.metadata["chunk_size"] == len(chunk.page_content) for chunk in chunks)
+
+def test_short_and_empty_documents():
+    assert as_tuples(main.chunk_documents([Document(page_content="tiny", metadata=METADATA)])) == [
+        ("tiny", {**METADATA, "chunk_id": 0, "chunk_size": 4})
+    ]
+    assert main.chunk_documents([]) == []
+    assert main.chunk_documents([Document(page_content="", metadata=METADATA)]) == []
+
+def test_section_carries_into_later_windows():
+    text = "# Intro\n" + "x" * 100 + "\n## Details\n" + "y" * 100
+    windows = [Document(page_content=text[start:start + 25], metadata=METADATA) for start in range(0, len(text), 25)]
+    chunks = main.chunk_documents(windows)
+
+    assert chunks[0].metadata["section"] == "Intro"
+    assert chunks[-1].metadata["section"] == "Details"
+    assert as_tuples(chunks) == as_tuples(main.chunk_documents([Document(page_content=text, metadata=METADATA)]))
+
+def test_heading_cut_by_window_boundary(monkeypatch):
+    monkeypatch.setattr(main, "CHUNK_SIZE_TOKENS", 4)
+    monkeypatch.setattr(main, "CHUNK_OVERLAP_TOKENS", 1)
+    text = "intro text\n## Installation steps\nrun it ## not a heading\nmore"
+    expected = main.chunk_documents([Document(page_content=text, metadata=METADATA)])
+
+    for cut in range(1, len(text)):
+        windows = [Document(page_content=text[:cut], metadata=METADATA), Document(page_content=text[cut:], metadata=METADATA)]
+        chunks = main.chunk_documents(windows)
+        assert as_tuples(chunks) == as_tuples(expected)
+        assert {chunk.metadata.get("section") for chunk in chunks} <= {None, "Installation steps"}
+
+def test_long_hash_line_is_body_text(monkeypatch):
+    text = "intro\n# " + "x" * (2 * 1024 * 1024) + "\n## Next\n" + "body " * 20
+    window_chars = 256 * 1024
+    windows = [Document(page_content=text[start:start + window_chars], metadata=METADATA) for start in range(0, len(text), window_chars)]
+    expected = main.chunk_documents([Document(page_content=text, metadata=METADATA)])
+
+    # Each window is tokenized with at most a chunk's worth of carried-over text
+    encoding = main.get_tokenizer()
+    encoded_lengths = []
+    def encode(source, **kwargs):
+        encoded_lengths.append(len(source))
+        return tiktoken.Encoding.encode(encoding, source, **kwargs)
+    monkeypatch.setattr(encoding, "encode", encode)
+    chunks = main.chunk_documents(windows)
+
+    assert max(encoded_lengths) <= window_chars + main.CHUNK_SIZE_TOKENS
+    assert as_tuples(chunks) == as_tuples(expected)
+    assert {chunk.metadata.get("section") for chunk in chunks} == {None, "Next"}
+
+def test_heading_longer_than_limit_is_ignored():
+    text = "intro\n# " + "y" * 300 + "\nbody text\n## Short\n" + "more body " * 10
+    expected = main.chunk_documents([Document(page_content=text, metadata=METADATA)])
+
+    for cut in (8, 100, 290, 320):
+        windows = [Document(page_content=text[:cut], metadata=METADATA), Document(page_content=text[cut:], metadata=METADATA)]
+        assert as_tuples(main.chunk_documents(windows)) == as_tuples(expected)
+    assert {chunk.metadata.get("section") for chunk in expected} == {None, "Short"}
@@ -0,0 +1,16 @@
+import numpy as np
+
+import main
+
+def test_quantized_vectors_use_full_int8_range():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(32, 1024)).astype(np.float32)
+    quantized = main.quantize_embeddings(vectors)
+
+    assert quantized.dtype == np.int8
+    assert (np.abs(quantized.astype(np.int32)).max(axis=-1) == 127).all()
+
+    # Cosine similarity to the original vectors is preserved
+    q = quantized.astype(np.float32)
+    cosine = (q * vectors).sum(axis=-1) / (np.linalg.norm(q, axis=-1) * np.linalg.norm(vectors, axis=-1))
+    assert (cosine > 0.99).all()
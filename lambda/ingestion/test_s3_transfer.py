@@ -0,0 +1,20 @@
+import boto3
+from boto3.s3.transfer import create_transfer_manager
+from s3transfer.crt import CRTTransferManager
+
+import main
+
+def test_transfer_config_builds_crt_manager():
+    # Same client settings as the Lambda, with fake credentials; no request is sent
+    client = boto3.client(
+        "s3",
+        region_name=main.AWS_REGION,
+        aws_access_key_id="testing",
+        aws_secret_access_key="testing",
+        config=main.s3_client.meta.config
+    )
+    manager = create_transfer_manager(client, main.S3_TRANSFER_CONFIG)
+    try:
+        assert isinstance(manager, CRTTransferManager)
+    finally:
+        manager.shutdown()
@@ -1,19 +1,26 @@
-import json
+import functools
 import logging
 import os
 import boto3
-from typing import List, Dict, Any
+import numpy as np
+import orjson
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import List, Dict, Any, Tuple
 
 # LangChain imports
 from langchain_aws import BedrockEmbeddings, ChatBedrock
+from langchain_core.embeddings import Embeddings
 from langchain_community.vectorstores import OpenSearchVectorSearch
-from langchain_community.vectorstores import Pinecone as PineconeVectorStore
-from langchain.chains import RetrievalQA
+from langchain_pinecone import PineconeVectorStore
 from langchain.prompts import PromptTemplate
-import pinecone
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables import RunnableParallel, RunnablePassthrough
+from pinecone import Pinecone
 
 # AWS SDK
 from opensearchpy import OpenSearch, RequestsHttpConnection, AWSV4SignerAuth
+from opensearchpy.exceptions import AuthorizationException
+from botocore.config import Config
 import boto3
 
 # Configure logging
@@ -27,29 +34,166 @@ AWS_REGION = os.environ.get("AWS_REGION", "us-east-1")
 VECTOR_STORE_TYPE = os.environ.get("VECTOR_STORE_TYPE", "opensearch")
 PINECONE_API_KEY = os.environ.get("PINECONE_API_KEY")
 PINECONE_ENVIRONMENT = os.environ.get("PINECONE_ENVIRONMENT", "us-east-1-aws")
+VECTOR_DATA_TYPE = os.environ.get("VECTOR_DATA_TYPE", "float")
+EMBEDDING_MODEL_ID = os.environ.get("EMBEDDING_MODEL_ID", "amazon.titan-embed-text-v2:0")
 
-# Initialize AWS clients
-bedrock_runtime = boto3.client("bedrock-runtime", region_name=AWS_REGION)
+# Initialize AWS clients (keep connections alive so warm invokes skip the TLS handshake;
+# the read timeout must still cover a full non-streamed answer)
+bedrock_runtime = boto3.client(
+    "bedrock-runtime",
+    region_name=AWS_REGION,
+    config=Config(
+        tcp_keepalive=True,
+        read_timeout=30,
+        retries={"max_attempts": 3, "mode": "adaptive"},
+        max_pool_connections=50
+    )
+)
 
-def create_vector_store():
-    """Create vector store instance for querying"""
-    # Initialize embeddings
+# Custom prompt template, parsed once at import (the indentation is part of the
+# prompt text the model has always been sent)
+PROMPT = PromptTemplate(
+    template="""
+    Human: Use the following context to answer the question. If you cannot answer based on the context provided, say so clearly.
+
+    Context:
+    {context}
+
+    Question: {question}
+
+    Please provide a clear, concise answer based only on the information provided in the context above.
+
+    Assistant:""",
+    input_variables=["context", "question"]
+)
+
+# Lazily built singletons, reused across warm invocations
+_EMBEDDINGS = None
+_VECTOR_STORE = None
+_LLM = None
+_QA_CHAIN = None
+_PC = None
+_PC_INDEX = None
+
+# Runs the query embedding call and its hedge
+_HEDGE_EXECUTOR = ThreadPoolExecutor(max_workers=4)
+
+# Resolve SigV4 credentials once per container
+_CREDS = boto3.Session().get_credentials() if VECTOR_STORE_TYPE == "opensearch" else None
+_AUTH = AWSV4SignerAuth(_CREDS, AWS_REGION, 'aoss') if _CREDS else None
+
+def refresh_opensearch_auth():
+    """Re-resolve AWS credentials and drop objects signed with the stale ones"""
+    global _CREDS, _AUTH, _VECTOR_STORE, _QA_CHAIN
+    _CREDS = boto3.Session().get_credentials()
+    _AUTH = AWSV4SignerAuth(_CREDS, AWS_REGION, 'aoss')
+    _VECTOR_STORE = None
+    _QA_CHAIN = None
+
+def call_with_auth_refresh(fn, *args, **kwargs):
+    """Call fn, refreshing OpenSearch credentials and retrying once if the signature is rejected"""
+    try:
+        return fn(*args, **kwargs)
+    except AuthorizationException:
+        logger.warning("OpenSearch rejected request signature, refreshing credentials")
+        refresh_opensearch_auth()
+        return fn(*args, **kwargs)
+
+def hedge_call(fn, *args, hedge_delay_ms: int = 500, max_hedges: int = 1, **kwargs):
+    """Call fn, firing a duplicate call each time hedge_delay_ms passes without a
+    result (up to max_hedges), and return whichever call succeeds first"""
+    pending = {_HEDGE_EXECUTOR.submit(fn, *args, **kwargs)}
+    hedges = 0
+    error = None
+    while True:
+        # Only wait out the hedge delay while there are hedges left to fire
+        timeout = hedge_delay_ms / 1000 if hedges < max_hedges else None
+        done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            # Losing calls are left to finish on the shared pool
+            if future.exception() is None:
+                return future.result()
+            error = future.exception()
+        
+        if not done:
+            pending.add(_HEDGE_EXECUTOR.submit(fn, *args, **kwargs))
+            hedges += 1
+        elif not pending:
+            raise error
+
+def create_embeddings():
+    """Create Bedrock embeddings instance for the model documents were indexed with"""
+    # LangChain embeds Cohere queries with the search_query input type
     embeddings = BedrockEmbeddings(
         client=bedrock_runtime,
-        model_id="amazon.titan-embed-text-v2:0"
+        model_id=EMBEDDING_MODEL_ID,
+        model_kwargs={"truncate": "END"} if EMBEDDING_MODEL_ID.startswith("cohere.") else None
     )
+    return embeddings
+
+def get_embeddings():
+    """Return the shared embeddings instance, creating it on first use"""
+    global _EMBEDDINGS
+    if _EMBEDDINGS is None:
+        _EMBEDDINGS = create_embeddings()
+    return _EMBEDDINGS
+
+def quantize_embeddings(vectors: List[List[float]]) -> List[List[int]]:
+    """Quantize embeddings to int8 for OpenSearch byte vectors, scaling each so its largest component maps to ±127 (cosine similarity is scale invariant)"""
+    arr = np.asarray(vectors, dtype=np.float32)
+    arr = arr * (127 / np.abs(arr).max(axis=-1, keepdims=True))
+    return np.clip(np.round(arr), -128, 127).astype(np.int8).tolist()
+
+@functools.lru_cache(maxsize=2048)
+def _embed_query(query: str, vector_store_type: str) -> Tuple[float, ...]:
+    """Embed a query with Bedrock, memoized so repeated queries skip the round-trip"""
+    vector = hedge_call(get_embeddings().embed_query, query, hedge_delay_ms=250)
+    
+    # Match the int8 representation stored in OpenSearch byte vector indexes
+    if vector_store_type == "opensearch" and VECTOR_DATA_TYPE == "byte":
+        return tuple(quantize_embeddings([vector])[0])
+    return tuple(vector)
+
+class CachedQueryEmbeddings(Embeddings):
+    """Embeddings wrapper that serves query embeddings from the in-memory cache"""
+    
+    def __init__(self, embeddings: Embeddings):
+        self.embeddings = embeddings
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+    
+    def embed_query(self, text: str) -> List[float]:
+        return list(_embed_query(text, VECTOR_STORE_TYPE))
+
+def get_pinecone_client():
+    """Return the shared Pinecone client, creating it on first use"""
+    global _PC
+    if _PC is None:
+        if not PINECONE_API_KEY:
+            raise ValueError("PINECONE_API_KEY environment variable is required for Pinecone")
+        _PC = Pinecone(api_key=PINECONE_API_KEY)
+    return _PC
+
+def get_pinecone_index():
+    """Return the shared Pinecone index handle, creating it on first use"""
+    global _PC_INDEX
+    if _PC_INDEX is None:
+        # Passing the host avoids a describe_index lookup to resolve it
+        _PC_INDEX = get_pinecone_client().Index(name=INDEX_NAME, host=OPENSEARCH_ENDPOINT or "")
+    return _PC_INDEX
+
+def create_vector_store():
+    """Create vector store instance for querying"""
+    embeddings = CachedQueryEmbeddings(get_embeddings())
     
     if VECTOR_STORE_TYPE == "opensearch":
-        # Create AWS auth for vector store
-        credentials = boto3.Session().get_credentials()
-        auth = AWSV4SignerAuth(credentials, AWS_REGION, 'aoss')
-        
         # Create vector store
         vector_store = OpenSearchVectorSearch(
             index_name=INDEX_NAME,
             embedding_function=embeddings,
             opensearch_url=OPENSEARCH_ENDPOINT,
-            http_auth=auth,
+            http_auth=_AUTH,
             use_ssl=True,
             verify_certs=True,
             connection_class=RequestsHttpConnection,
@@ -58,18 +202,9 @@ def create_vector_store():
         return vector_store
     
     elif VECTOR_STORE_TYPE == "pinecone":
-        if not PINECONE_API_KEY:
-            raise ValueError("PINECONE_API_KEY environment variable is required for Pinecone")
-        
-        # Initialize Pinecone
-        pinecone.init(
-            api_key=PINECONE_API_KEY,
-            environment=PINECONE_ENVIRONMENT
-        )
-        
-        # Create vector store
-        vector_store = PineconeVectorStore.from_existing_index(
-            index_name=INDEX_NAME,
+        # Create vector store on the pooled index handle
+        vector_store = PineconeVectorStore(
+            index=get_pinecone_index(),
             embedding=embeddings
         )
         return vector_store
@@ -77,6 +212,13 @@ def create_vector_store():
     else:
         raise ValueError(f"Unsupported vector store type: {VECTOR_STORE_TYPE}")
 
+def get_vector_store():
+    """Return the shared vector store instance, creating it on first use"""
+    global _VECTOR_STORE
+    if _VECTOR_STORE is None:
+        _VECTOR_STORE = create_vector_store()
+    return _VECTOR_STORE
+
 def create_llm():
     """Create Bedrock LLM instance"""
     llm = ChatBedrock(
@@ -90,64 +232,68 @@ def create_llm():
     )
     return llm
 
-def create_qa_chain():
-    """Create RetrievalQA chain"""
-    vector_store = create_vector_store()
-    llm = create_llm()
-    
-    # Create custom prompt template
-    prompt_template = """
-    Human: Use the following context to answer the question. If you cannot answer based on the context provided, say so clearly.
+def get_llm():
+    """Return the shared LLM instance, creating it on first use"""
+    global _LLM
+    if _LLM is None:
+        _LLM = create_llm()
+    return _LLM
 
-    Context:
-    {context}
+def format_docs(docs) -> str:
+    """Join retrieved documents into the prompt context"""
+    return "\n\n".join(doc.page_content for doc in docs)
 
-    Question: {question}
-
-    Please provide a clear, concise answer based only on the information provided in the context above.
-
-    Assistant:"""
-    
-    PROMPT = PromptTemplate(
-        template=prompt_template,
-        input_variables=["context", "question"]
+def create_qa_chain():
+    """Create the retrieval QA pipeline"""
+    retriever = get_vector_store().as_retriever(
+        search_type="similarity",
+        search_kwargs={"k": 5},
     )
     
-    # Create retrieval QA chain
-    qa_chain = RetrievalQA.from_chain_type(
-        llm=llm,
-        chain_type="stuff",
-        retriever=vector_store.as_retriever(
-            search_type="similarity",
-            search_kwargs={"k": 5},
-        ),
-        chain_type_kwargs={"prompt": PROMPT},
-        return_source_documents=True
+    # Generate the answer from documents already retrieved upstream
+    answer_chain = (
+        RunnablePassthrough.assign(context=lambda x: format_docs(x["source_documents"]))
+        | PROMPT
+        | get_llm()
+        | StrOutputParser()
     )
     
+    # Retrieve once and share the documents between the prompt and the sources
+    qa_chain = RunnableParallel(
+        source_documents=retriever,
+        question=RunnablePassthrough()
+    ) | RunnablePassthrough.assign(result=answer_chain)
+    
     return qa_chain
 
+def get_qa_chain():
+    """Return the shared QA pipeline, creating it on first use"""
+    global _QA_CHAIN
+    if _QA_CHAIN is None:
+        _QA_CHAIN = create_qa_chain()
+    return _QA_CHAIN
+
+def format_source(doc) -> Dict[str, Any]:
+    """Summarize a source document for the response"""
+    content = doc.page_content
+    metadata = doc.metadata
+    return {
+        "source": metadata.get("source", "Unknown"),
+        "chunk_id": metadata.get("chunk_id", 0),
+        "score": getattr(doc, '_score', 0),
+        "content_preview": content[:200] + "..." if len(content) > 200 else content
+    }
+
 def format_response(result: Dict[str, Any]) -> Dict[str, Any]:
     """Format the response with sources"""
-    response = {
-        "answer": result["result"],
-        "sources": []
+    return {
+        "response": result["result"],
+        "sources": [format_source(doc) for doc in result.get("source_documents", [])]
     }
-    
-    # Extract source information
-    for doc in result.get("source_documents", []):
-        source_info = {
-            "source": doc.metadata.get("source", "Unknown"),
-            "chunk_id": doc.metadata.get("chunk_id", 0),
-            "content_preview": doc.page_content[:200] + "..." if len(doc.page_content) > 200 else doc.page_content
-        }
-        response["sources"].append(source_info)
-    
-    return response
 
 def search_similar_documents(query: str, k: int = 5) -> List[Dict[str, Any]]:
     """Search for similar documents and return raw results"""
-    vector_store = create_vector_store()
+    vector_store = get_vector_store()
     
     # Perform similarity search
     docs = vector_store.similarity_search_with_score(query, k=k)
@@ -166,12 +312,14 @@ def search_similar_documents(query: str, k: int = 5) -> List[Dict[str, Any]]:
 
 def lambda_handler(event, context):
     """Main Lambda handler for document querying"""
-    logger.info(f"Received event: {json.dumps(event)}")
+    # Serializing the whole event is only worth it when debugging
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Received event: {orjson.dumps(event).decode()}")
     
     try:
         # Parse request body
         if isinstance(event.get('body'), str):
-            body = json.loads(event['body'])
+            body = orjson.loads(event['body'])
         else:
             body = event.get('body', {})
         
@@ -183,9 +331,9 @@ def lambda_handler(event, context):
                     'Content-Type': 'application/json',
                     'Access-Control-Allow-Origin': '*'
                 },
-                'body': json.dumps({
+                'body': orjson.dumps({
                     'error': 'Query parameter is required'
-                })
+                }).decode()
             }
         
         logger.info(f"Processing query: {query}")
@@ -195,7 +343,7 @@ def lambda_handler(event, context):
         
         if search_only:
             # Return raw search results without LLM processing
-            similar_docs = search_similar_documents(query)
+            similar_docs = call_with_auth_refresh(search_similar_documents, query)
             
             response_data = {
                 'query': query,
@@ -203,26 +351,14 @@ def lambda_handler(event, context):
                 'type': 'similarity_search'
             }
         else:
-            # Use RetrievalQA chain for full RAG pipeline
-            qa_chain = create_qa_chain()
-            result = qa_chain({"query": query})
+            # Run the full RAG pipeline
+            result = call_with_auth_refresh(lambda: get_qa_chain().invoke(query))
             
             # Format response
             response_data = {
                 'query': query,
-                'response': result["result"],
-                'sources': []
+                **format_response(result)
             }
-            
-            # Add source information
-            for doc in result.get("source_documents", []):
-                source_info = {
-                    "source": doc.metadata.get("source", "Unknown"),
-                    "chunk_id": doc.metadata.get("chunk_id", 0),
-                    "score": getattr(doc, '_score', 0),
-                    "content_preview": doc.page_content[:200] + "..." if len(doc.page_content) > 200 else doc.page_content
-                }
-                response_data["sources"].append(source_info)
         
         logger.info(f"Successfully processed query: {query} using {VECTOR_STORE_TYPE} vector store")
         
@@ -232,7 +368,7 @@ def lambda_handler(event, context):
                 'Content-Type': 'application/json',
                 'Access-Control-Allow-Origin': '*'
             },
-            'body': json.dumps(response_data)
+            'body': orjson.dumps(response_data).decode()
         }
         
     except Exception as e:
@@ -243,8 +379,14 @@ def lambda_handler(event, context):
                 'Content-Type': 'application/json',
                 'Access-Control-Allow-Origin': '*'
             },
-            'body': json.dumps({
+            'body': orjson.dumps({
                 'error': str(e),
                 'message': 'Internal server error'
-            })
-        }
\ No newline at end of file
+            }).decode()
+        }
+
+# Pre-warm the chain during init so only the cold start pays for construction
+try:
+    get_qa_chain()
+except Exception as e:
+    logger.warning(f"Failed to pre-warm QA chain: {str(e)}")
@@ -59,7 +59,10 @@ describe("Ingestion Component", () => {
                         VECTOR_STORE_ENDPOINT: "https://test-collection.us-west-2.aoss.amazonaws.com",
                         VECTOR_STORE_TYPE: "opensearch",
                         INDEX_NAME: "test-index",
-                        PINECONE_API_KEY: ""
+                        PINECONE_API_KEY: "",
+                        VECTOR_DATA_TYPE: "float",
+                        EMBEDDING_MODEL_ID: "amazon.titan-embed-text-v2:0",
+                        EMBEDDING_CACHE_TABLE: ""
                     }
                 });
             });
@@ -95,7 +98,10 @@ describe("Ingestion Component", () => {
                         VECTOR_STORE_ENDPOINT: "https://test-index.svc.us-west-2.pinecone.io",
                         VECTOR_STORE_TYPE: "pinecone",
                         INDEX_NAME: "test-index",
-                        PINECONE_API_KEY: "mock-pinecone-api-key"
+                        PINECONE_API_KEY: "mock-pinecone-api-key",
+                        VECTOR_DATA_TYPE: "float",
+                        EMBEDDING_MODEL_ID: "amazon.titan-embed-text-v2:0",
+                        EMBEDDING_CACHE_TABLE: ""
                     }
                 });
             });
@@ -103,6 +109,36 @@ describe("Ingestion Component", () => {
     });
 
 
+    describe("Embedding Cache Configuration", function() {
+        let ingestion: Ingestion;
+
+        before(function() {
+            ingestion = new Ingestion("test-ingestion", {
+                inputBucket: mockInputBucket,
+                vectorStoreConfig: {
+                    type: "opensearch",
+                    endpoint: pulumi.output("https://test-collection.us-west-2.aoss.amazonaws.com"),
+                    indexName: pulumi.output("test-index")
+                },
+                embeddingCache: true
+            });
+        });
+
+        it("should create the embedding cache table keyed by content hash", function () {
+            expect(ingestion.embeddingCacheTable).to.not.be.undefined;
+            return pulumi.all([ingestion.embeddingCacheTable!.hashKey, ingestion.embeddingCacheTable!.billingMode]).apply(([hashKey, billingMode]) => {
+                expect(hashKey).to.equal("hash");
+                expect(billingMode).to.equal("PAY_PER_REQUEST");
+            });
+        });
+
+        it("should pass the table name to the lambda function", function () {
+            return pulumi.all([ingestion.lambda.environment, ingestion.embeddingCacheTable!.name]).apply(([environment, tableName]) => {
+                expect(environment?.variables?.EMBEDDING_CACHE_TABLE).to.equal(tableName);
+            });
+        });
+    });
+
     describe("Lambda Invoke Permission", function() {
         let ingestion: Ingestion;   
 
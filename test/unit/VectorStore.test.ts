@@ -57,6 +57,28 @@ describe("VectorStore Component", () => {
                 }
             });
         });
+
+        it("should default the vector data type to float", function(done) {
+            const vectorStore = new VectorStore("test-store", { type: "opensearch", collectionName: "test-collection" });
+            
+            try {
+                expect(vectorStore.config.dataType).to.equal("float");
+                done();
+            } catch (e) {
+                done(e);
+            }
+        });
+
+        it("should pass through the byte vector data type", function(done) {
+            const vectorStore = new VectorStore("test-store", { type: "opensearch", collectionName: "test-collection", dataType: "byte" });
+            
+            try {
+                expect(vectorStore.config.dataType).to.equal("byte");
+                done();
+            } catch (e) {
+                done(e);
+            }
+        });
     });
 
     describe("Pinecone Configuration", () => {